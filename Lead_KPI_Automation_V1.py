@@ -3,15 +3,14 @@
 # GitHub Actions Compatible — identical output to local version
 # ============================================================
 
-import pandas as pd
 import numpy as np
-import re
 import gspread
 from google.oauth2.service_account import Credentials
-from pandas import ExcelWriter
-from datetime import datetime
+from pandas.api.types import is_numeric_dtype
 import os
 
+from kpi_core import compute_kpi, values_to_df
+
 # ==== 1) Connect to Google Sheets using Secrets ====
 SHEET_ID_LEAD = os.getenv("SHEET_ID_LEAD")
 SHEET_ID_PDR = os.getenv("SHEET_ID_PDR")
@@ -27,271 +26,78 @@ scope = [
 creds = Credentials.from_service_account_file("service_account.json", scopes=scope)
 client = gspread.authorize(creds)
 
-# ==== 2) Load Lead KPI Sheet (MASTER) ====
+# ==== 2) Load Lead KPI + Attendance Sheets (MASTER) in one request ====
 spreadsheet_lead = client.open_by_key(SHEET_ID_LEAD)
-ws_lead = spreadsheet_lead.worksheet("Lead")
-lead_data = ws_lead.get("B:J")  # B–J: Lead → Discipline & Punctuality
-lead_df = pd.DataFrame(lead_data[1:], columns=lead_data[0])
+lead_resp = spreadsheet_lead.values_batch_get(ranges=[
+    "Lead!B:J",     # B–J: Lead → Discipline & Punctuality
+    "Attendance",
+])
+lead_ranges = lead_resp.get("valueRanges", [])
+lead_df = values_to_df(lead_ranges[0].get("values", []))
 lead_df.columns = lead_df.columns.str.strip()
+attendance_df = values_to_df(lead_ranges[1].get("values", []))
+attendance_df.columns = attendance_df.columns.str.strip()
 
 # ==== 3) Load Project Hours + PDR Sheet ====
 spreadsheet_pdr = client.open_by_key(SHEET_ID_PDR)
-ws_pdr = spreadsheet_pdr.worksheet("Project_Hours")
-pdr_data = ws_pdr.get_all_records()
-pdr_df = pd.DataFrame(pdr_data)
+pdr_resp = spreadsheet_pdr.values_batch_get(ranges=["Project_Hours"])
+pdr_df = values_to_df(pdr_resp.get("valueRanges", [{}])[0].get("values", []))
 pdr_df.columns = pdr_df.columns.str.strip()
 
-# ==== 4) Load Attendance Sheet (from MASTER) ====
-ws_att = spreadsheet_lead.worksheet("Attendance")
-att_data = ws_att.get_all_records()
-attendance_df = pd.DataFrame(att_data)
-attendance_df.columns = attendance_df.columns.str.strip()
-
-# ---- Helpers ----
-def clean_qai_id(x):
-    if pd.isna(x): 
-        return None
-    x = str(x).upper().strip().replace(" ", "_")
-    x = re.sub(r"_+", "_", x)
-    return x
-
-def to_num(s):
-    return pd.to_numeric(s, errors="coerce")
-
-def normalize_month(value):
-    if pd.isna(value):
-        return None
-    value = str(value).strip().lower()
-    months = {
-        "jan": "January", "feb": "February", "mar": "March", "apr": "April",
-        "may": "May", "jun": "June", "jul": "July", "aug": "August",
-        "sep": "September", "oct": "October", "nov": "November", "dec": "December"
-    }
-    for abbr, full in months.items():
-        if value.startswith(abbr):
-            return full
-    return value.capitalize()
-
+# ---- Upload helpers ----
 def clean_for_gsheet(df):
-    """Clean invalid JSON/float values before upload"""
-    return df.replace([np.inf, -np.inf, np.nan], "").fillna("").astype(str)
-
-# ==== 5) Normalize/rename columns ====
-pdr_df = pdr_df.rename(columns={
-    "Project Batch": "Project name",
-    "SUM of Effective Work Hour": "Project Hour"
-})
-
-# Attendance sheet: handle Attendance Score or Score
-att_colmap = {}
-if "QAI_ID" not in attendance_df.columns and "ID" in attendance_df.columns:
-    att_colmap["ID"] = "QAI_ID"
-attendance_df = attendance_df.rename(columns=att_colmap)
-
-# ---- Attendance numeric handling ----
-if "Attendance Score" in attendance_df.columns:
-    attendance_df["Attendance Score"] = to_num(attendance_df["Attendance Score"]).fillna(0)
-    attendance_df["Score"] = attendance_df["Attendance Score"]  # unify naming
-elif "Score" in attendance_df.columns:
-    attendance_df["Score"] = to_num(attendance_df["Score"]).fillna(0)
-else:
-    attendance_df["Score"] = 0
-
-if "Training and assessment performance" in attendance_df.columns:
-    attendance_df["Training and assessment performance"] = to_num(
-        attendance_df["Training and assessment performance"]
-    ).fillna(0)
-else:
-    attendance_df["Training and assessment performance"] = 0
-
-# ==== 6) Ensure numeric columns in Lead + PDR ====
-lead_num_cols = [
-    "Quality Score (RCA)",
-    "Project Delivery Timeliness",
-    "Documentation & Reporting",
-    "Communication Efficiency",
-    "Discipline & Punctuality",
-]
-
-if "Communication Efficiency " in lead_df.columns and "Communication Efficiency" not in lead_df.columns:
-    lead_df = lead_df.rename(columns={"Communication Efficiency ": "Communication Efficiency"})
-
-lead_df[lead_num_cols] = lead_df[lead_num_cols].apply(to_num).fillna(0)
-pdr_df["Project Hour"] = to_num(pdr_df.get("Project Hour", 0)).fillna(0)
-pdr_df["PDR"] = to_num(pdr_df.get("PDR", 0)).fillna(0)
-
-# ==== 7) Clean IDs and Months ====
-lead_df["QAI_ID"] = lead_df["QAI_ID"].apply(clean_qai_id)
-if "QAI_ID" in attendance_df.columns:
-    attendance_df["QAI_ID"] = attendance_df["QAI_ID"].apply(clean_qai_id)
-
-lead_df["Month"] = lead_df["Month"].apply(normalize_month)
-attendance_df["Month"] = attendance_df["Month"].apply(normalize_month)
-
-# ==== 8) Monthly KPI Averages ====
-monthly_core = (
-    lead_df.groupby(["Month", "QAI_ID"], as_index=False)
-    .agg({
-        "Quality Score (RCA)": "mean",
-        "Project Delivery Timeliness": "mean",
-        "Documentation & Reporting": "mean",
-        "Communication Efficiency": "mean",
-        "Discipline & Punctuality": "mean",
-        "Lead": "first",
-        "Project name": lambda x: ", ".join(sorted(set(pd.Series(x).dropna())))
-    })
-)
-
-# ==== 8b) Calculate Project Count per Month per QAI_ID ====
-project_count = (
-    lead_df.groupby(["Month", "QAI_ID"], as_index=False)
-    .agg({"Project name": lambda x: len(set(pd.Series(x).dropna()))})
-    .rename(columns={"Project name": "Project Count"})
-)
-
-# ==== 9–13) Contributions and Attendance Merge ====
-lead_with_hours = lead_df.merge(
-    pdr_df[["Project name", "PDR", "Project Hour"]],
-    on="Project name",
-    how="left"
+    """Clean invalid JSON/float values before upload (numbers stay numbers)"""
+    out = df.copy()
+    for col in out.columns:
+        if is_numeric_dtype(out[col]):
+            out[col] = out[col].replace([np.inf, -np.inf], np.nan).fillna(0)
+        elif out[col].hasnans:
+            out[col] = out[col].astype(object).fillna("")
+    return out
+
+def df_to_values(df):
+    """Header + rows as one object matrix -> list of lists for the Sheets API"""
+    return np.vstack([
+        df.columns.to_numpy(dtype=object)[None, :],
+        df.to_numpy(dtype=object),
+    ]).tolist()
+
+# ==== 5–15) Normalize, aggregate and score (shared KPI core) ====
+monthly_core, lead_contrib, attendance_agg, project_count, merged, final_report = compute_kpi(
+    lead_df, pdr_df, attendance_df
 )
-lead_with_hours["PDR"] = to_num(lead_with_hours["PDR"]).fillna(0)
-lead_with_hours["Project Hour"] = to_num(lead_with_hours["Project Hour"]).fillna(0)
-lead_with_hours["Weighted_Contribution"] = lead_with_hours["PDR"] * lead_with_hours["Project Hour"]
-
-lead_contrib = (
-    lead_with_hours.groupby(["Month", "QAI_ID"], as_index=False)
-    .agg({"Weighted_Contribution": "sum"})
-    .rename(columns={"Weighted_Contribution": "Lead_Contribution"})
-)
-total_contrib = (
-    lead_contrib.groupby("Month", as_index=False)
-    .agg({"Lead_Contribution": "sum"})
-    .rename(columns={"Lead_Contribution": "Total_Month_Contribution"})
-)
-lead_contrib = lead_contrib.merge(total_contrib, on="Month", how="left")
-lead_contrib["Contribution_%"] = (
-    (lead_contrib["Lead_Contribution"] / lead_contrib["Total_Month_Contribution"]) * 100
-).round(2).fillna(0)
-
-def contribution_to_rating(pct):
-    if pct >= 20: return 5
-    if pct >= 16: return 4
-    if pct >= 11: return 3
-    if pct >= 5:  return 2
-    return 1
-
-lead_contrib["Contribution_Rating"] = lead_contrib["Contribution_%"].apply(contribution_to_rating)
-
-attendance_agg = (
-    attendance_df.groupby(["Month", "QAI_ID"], as_index=False)
-    .agg({
-        "Score": "mean",
-        "Training and assessment performance": "mean"
-    })
-    .rename(columns={
-        "Score": "Attendance",
-        "Training and assessment performance": "Training and assessment performance"
-    })
-)
-
-merged = monthly_core.merge(lead_contrib, on=["Month", "QAI_ID"], how="left")
-merged = merged.merge(attendance_agg, on=["Month", "QAI_ID"], how="left")
-merged = merged.merge(project_count, on=["Month", "QAI_ID"], how="left")
-
-for c in ["Contribution_%", "Contribution_Rating", "Attendance", "Training and assessment performance"]:
-    if c not in merged.columns:
-        merged[c] = 0
-    merged[c] = to_num(merged[c]).fillna(0)
-
-# ==== 14) Weighted Scoring ====
-merged["Score_Quality"]       = 0.20  * merged["Quality Score (RCA)"]
-merged["Score_Timeliness"]    = 0.10  * merged["Project Delivery Timeliness"]
-merged["Score_Documentation"] = 0.10  * merged["Documentation & Reporting"]
-merged["Score_Communication"] = 0.10  * merged["Communication Efficiency"]
-merged["Score_Discipline"]    = 0.075 * merged["Discipline & Punctuality"]
-merged["Score_Contribution"]  = 0.15  * merged["Contribution_Rating"]
-merged["Score_Attendance"]    = 0.075 * merged["Attendance"]
-merged["Score_Training"]      = 0.20  * merged["Training and assessment performance"]
-
-merged["Final KPI Score"] = (
-    merged["Score_Quality"] +
-    merged["Score_Timeliness"] +
-    merged["Score_Documentation"] +
-    merged["Score_Communication"] +
-    merged["Score_Discipline"] +
-    merged["Score_Contribution"] +
-    merged["Score_Attendance"] +
-    merged["Score_Training"]
-).round(2)
-
-# ==== 15) Final Report ====
-final_report = merged[[
-    "Month", "QAI_ID", "Lead", "Project name", "Project Count",
-    "Score_Quality", "Score_Timeliness", "Score_Documentation",
-    "Score_Communication", "Score_Discipline",
-    "Score_Contribution", "Score_Attendance", "Score_Training",
-    "Final KPI Score"
-]].copy()
-
-final_report.columns = [
-    "Month",
-    "QAI_ID",
-    "Lead",
-    "Project Name",
-    "Project Count",
-    "Quality Score (RCA) (Out of 1.00 | Weight: 20%)",
-    "Project Delivery Timeliness (Out of 0.50 | Weight: 10%)",
-    "Documentation & Reporting (Out of 0.50 | Weight: 10%)",
-    "Communication Efficiency (Out of 0.50 | Weight: 10%)",
-    "Discipline & Punctuality (Out of 0.375 | Weight: 7.5%)",
-    "Contribution Rating (Out of 0.75 | Weight: 15%)",
-    "Attendance (Out of 0.375 | Weight: 7.5%)",
-    "Training & Assessment Performance (Out of 1.00 | Weight: 20%)",
-    "Final KPI Score (Weighted Total Out of 5.00)"
-]
-
-final_report = clean_for_gsheet(final_report)
-
-# ==== 15) Final Report (exact headers like original) ====
-final_report = merged[[
-    "Month", "QAI_ID", "Lead", "Project name", "Project Count",
-    "Score_Quality", "Score_Timeliness", "Score_Documentation",
-    "Score_Communication", "Score_Discipline",
-    "Score_Contribution", "Score_Attendance", "Score_Training",
-    "Final KPI Score"
-]].copy()
-
-# rename "Project name" -> "Project Name" and map exact header labels
-final_report.columns = [
-    "Month",
-    "QAI_ID",
-    "Lead",
-    "Project Name",
-    "Project Count",
-    "Quality Score (RCA) (Out of 1.00 | Weight: 20%)",
-    "Project Delivery Timeliness (Out of 0.50 | Weight: 10%)",
-    "Documentation & Reporting (Out of 0.50 | Weight: 10%)",
-    "Communication Efficiency (Out of 0.50 | Weight: 10%)",
-    "Discipline & Punctuality (Out of 0.375 | Weight: 7.5%)",
-    "Contribution Rating (Out of 0.75 | Weight: 15%)",
-    "Attendance (Out of 0.375 | Weight: 7.5%)",
-    "Training & Assessment Performance (Out of 1.00 | Weight: 20%)",
-    "Final KPI Score (Weighted Total Out of 5.00)"
-]
 
 # clean for upload (avoid NaN/inf JSON errors)
-final_report = final_report.replace([np.nan, np.inf, -np.inf], "").fillna("")
+final_report = clean_for_gsheet(final_report)
 
 # ==== 16) Upload to Google Sheets (same destination as original) ====
-try:
-    ws_report = spreadsheet_lead.worksheet("Final Report_Lead")
-    spreadsheet_lead.del_worksheet(ws_report)
-except:
-    pass
-
-ws_report = spreadsheet_lead.add_worksheet(title="Final Report_Lead", rows=2000, cols=30)
-ws_report.update([final_report.columns.values.tolist()] + final_report.values.tolist())
-
-print("✅ Successfully exported: Final Report_Lead")
+# Tabs are replaced in one batch_update and filled in one values_batch_update
+sheet_data = {"Final Report_Lead": final_report}
+
+existing_sheet_ids = {
+    ws["properties"]["title"]: ws["properties"]["sheetId"]
+    for ws in spreadsheet_lead.fetch_sheet_metadata()["sheets"]
+}
+tab_requests = []
+for name, df in sheet_data.items():
+    if name in existing_sheet_ids:
+        tab_requests.append({"deleteSheet": {"sheetId": existing_sheet_ids[name]}})
+    tab_requests.append({"addSheet": {"properties": {
+        "title": name,
+        "gridProperties": {
+            "rowCount": max(2000, len(df) + 1),
+            "columnCount": max(30, len(df.columns)),
+        },
+    }}})
+spreadsheet_lead.batch_update({"requests": tab_requests})
+
+spreadsheet_lead.values_batch_update({
+    "valueInputOption": "RAW",
+    "data": [
+        {"range": f"'{name}'!A1", "values": df_to_values(df)}
+        for name, df in sheet_data.items()
+    ],
+})
 
+for name in sheet_data:
+    print(f"✅ Successfully exported: {name}")
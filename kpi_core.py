@@ -0,0 +1,302 @@
+# ============================================================
+# Lead KPI core: normalization, aggregation and weighted scoring
+# Shared by the entry-point scripts; no Google Sheets I/O here
+# ============================================================
+
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+from pandas.api.types import is_numeric_dtype, union_categoricals
+
+# 3-letter lowercase prefix -> full month name (built once, not per call)
+MONTHS = {
+    "jan": "January", "feb": "February", "mar": "March", "apr": "April",
+    "may": "May", "jun": "June", "jul": "July", "aug": "August",
+    "sep": "September", "oct": "October", "nov": "November", "dec": "December"
+}
+
+# ---- Helpers ----
+def values_to_df(values):
+    """Build a DataFrame from a raw Sheets value matrix (first row = header)"""
+    if not values:
+        return pd.DataFrame()
+    header = [str(h) for h in values[0]]
+    width = len(header)
+    # Sheets API trims trailing empty cells (a blank row comes back as []): skip rows
+    # with no content and pad the rest with None, like ws.get() did, so missing keys
+    # are dropped by the (Month, QAI_ID) grouping instead of forming a ("", "") group
+    rows = [
+        (row + [None] * (width - len(row)))[:width]
+        for row in values[1:]
+        if any(cell != "" for cell in row[:width])
+    ]
+    return pd.DataFrame(rows, columns=header).convert_dtypes(dtype_backend="pyarrow")
+
+def clean_qai_id_series(s):
+    """Vectorized QAI_ID cleanup: upper-case, trim, spaces/underscores -> single '_'"""
+    return (
+        s.astype("string")
+        .str.upper()
+        .str.strip()
+        .str.replace(" ", "_", regex=False)
+        .str.replace(r"_+", "_", regex=True)
+    )
+
+def to_num(s):
+    """Coerce to numbers; text cells drop thousands separators ("1,176.60" -> 1176.6)"""
+    if isinstance(s, pd.Series) and not is_numeric_dtype(s):
+        s = s.astype("string").str.replace(",", "", regex=False)
+    return pd.to_numeric(s, errors="coerce", dtype_backend="pyarrow")
+
+def to_num_block(df):
+    """Coerce several columns with one to_numeric call over the flattened values"""
+    flat = to_num(pd.Series(df.to_numpy(dtype=object).ravel())).fillna(0)
+    return pd.DataFrame(
+        flat.to_numpy(np.float64).reshape(df.shape), index=df.index, columns=df.columns
+    )
+
+def normalize_month_series(s):
+    """Vectorized month normalization: 'jan', 'Jan 2025', ... -> 'January'"""
+    value = s.astype("string").str.strip().str.lower()
+    return value.str[:3].map(MONTHS).fillna(value.str.capitalize())
+
+def to_shared_categories(*series):
+    """Convert key columns to categoricals sharing one sorted category set"""
+    cats = union_categoricals(
+        [ser.astype("string").astype("category") for ser in series],
+        sort_categories=True,
+    ).categories
+    return [pd.Categorical(ser.astype("string"), categories=cats) for ser in series]
+
+def compute_kpi(lead_df, pdr_df, attendance_df):
+    """Run Sections 5–15 on the loaded sheets; the caller's frames are left unchanged.
+
+    Returns (monthly_core, lead_contrib, attendance_agg, project_count, merged, final_report)
+    """
+    lead_df = lead_df.copy()
+
+    # ==== 5) Normalize/rename columns ====
+    pdr_df = pdr_df.rename(columns={
+        "Project Batch": "Project name",
+        "SUM of Effective Work Hour": "Project Hour"
+    })
+
+    # Attendance sheet: handle Attendance Score or Score
+    att_colmap = {}
+    if "QAI_ID" not in attendance_df.columns and "ID" in attendance_df.columns:
+        att_colmap["ID"] = "QAI_ID"
+    attendance_df = attendance_df.rename(columns=att_colmap)
+
+    # ---- Attendance numeric handling ----
+    if "Attendance Score" in attendance_df.columns:
+        attendance_df["Attendance Score"] = to_num(attendance_df["Attendance Score"]).fillna(0)
+        attendance_df["Score"] = attendance_df["Attendance Score"]  # unify naming
+    elif "Score" in attendance_df.columns:
+        attendance_df["Score"] = to_num(attendance_df["Score"]).fillna(0)
+    else:
+        attendance_df["Score"] = 0
+
+    if "Training and assessment performance" in attendance_df.columns:
+        attendance_df["Training and assessment performance"] = to_num(
+            attendance_df["Training and assessment performance"]
+        ).fillna(0)
+    else:
+        attendance_df["Training and assessment performance"] = 0
+
+    # ==== 6) Ensure numeric columns in Lead + PDR ====
+    lead_num_cols = [
+        "Quality Score (RCA)",
+        "Project Delivery Timeliness",
+        "Documentation & Reporting",
+        "Communication Efficiency",
+        "Discipline & Punctuality",
+    ]
+
+    if "Communication Efficiency " in lead_df.columns and "Communication Efficiency" not in lead_df.columns:
+        lead_df = lead_df.rename(columns={"Communication Efficiency ": "Communication Efficiency"})
+
+    lead_df[lead_num_cols] = to_num_block(lead_df[lead_num_cols])
+    pdr_df["Project Hour"] = to_num(pdr_df.get("Project Hour", 0)).fillna(0)
+    pdr_df["PDR"] = to_num(pdr_df.get("PDR", 0)).fillna(0)
+
+    # ==== 7) Clean IDs and Months ====
+    lead_df["QAI_ID"] = clean_qai_id_series(lead_df["QAI_ID"])
+    if "QAI_ID" in attendance_df.columns:
+        attendance_df["QAI_ID"] = clean_qai_id_series(attendance_df["QAI_ID"])
+
+    lead_df["Month"] = normalize_month_series(lead_df["Month"])
+    attendance_df["Month"] = normalize_month_series(attendance_df["Month"])
+
+    # ==== 7b) Categorical join keys (shared categories -> int-code groupby/merge) ====
+    for col in ("Month", "QAI_ID"):
+        lead_df[col], attendance_df[col] = to_shared_categories(lead_df[col], attendance_df[col])
+    lead_df["Project name"], pdr_df["Project name"] = to_shared_categories(
+        lead_df["Project name"], pdr_df["Project name"]
+    )
+
+    # ==== 8) Monthly KPI Averages + Lead Contribution (one sweep over key codes) ====
+    # PDR × Project Hour per project, looked up per lead row by category code
+    # (replaces merging PDR onto every lead row before grouping)
+    project_weight = (
+        (pdr_df["PDR"] * pdr_df["Project Hour"])
+        .groupby(pdr_df["Project name"], observed=False).sum()
+        .to_numpy(np.float64)
+    )
+    project_codes = lead_df["Project name"].cat.codes.to_numpy(np.int64)
+    row_weight = np.zeros(len(project_codes))
+    has_project = project_codes >= 0
+    row_weight[has_project] = project_weight[project_codes[has_project]]
+
+    # (Month, QAI_ID) codes -> dense group index; rows with a missing key are dropped like groupby does
+    month_cats = lead_df["Month"].cat.categories
+    qai_cats = lead_df["QAI_ID"].cat.categories
+    month_codes = lead_df["Month"].cat.codes.to_numpy(np.int64)
+    qai_codes = lead_df["QAI_ID"].cat.codes.to_numpy(np.int64)
+    valid = (month_codes >= 0) & (qai_codes >= 0)
+    group_keys, group_idx = np.unique(
+        month_codes[valid] * len(qai_cats) + qai_codes[valid], return_inverse=True
+    )
+    group_index = pd.MultiIndex.from_arrays([
+        pd.Categorical.from_codes(group_keys // len(qai_cats), categories=month_cats),
+        pd.Categorical.from_codes(group_keys % len(qai_cats), categories=qai_cats),
+    ], names=["Month", "QAI_ID"])
+
+    # per-group sums of the 5 KPI columns + weighted contribution, and row counts
+    sweep_values = np.column_stack([
+        lead_df[lead_num_cols].to_numpy(np.float64)[valid],
+        row_weight[valid],
+    ])
+    group_sums = np.column_stack([
+        np.bincount(group_idx, weights=col, minlength=len(group_keys)) for col in sweep_values.T
+    ])
+    group_counts = np.bincount(group_idx, minlength=len(group_keys))
+
+    monthly_core = pd.DataFrame(
+        group_sums[:, :-1] / group_counts[:, None], index=group_index, columns=lead_num_cols
+    )
+
+    # Lead / project columns: one Arrow hash aggregation over the same dense group index
+    # (first Lead, distinct project codes and their count in a single pass)
+    # blank project names count as missing, so the list and Project Count agree
+    project_cats = lead_df["Project name"].cat.categories
+    project_missing = project_codes < 0
+    if "" in project_cats:
+        project_missing |= project_codes == project_cats.get_loc("")
+    lead_table = pa.table({
+        "group": group_idx,
+        "Lead": pa.array(lead_df["Lead"]).filter(pa.array(valid)),
+        "project": pa.array(project_codes[valid], mask=project_missing[valid]),
+    })
+    lead_agg = (
+        lead_table.group_by("group", use_threads=False)
+        .aggregate([("Lead", "first"), ("project", "count_distinct"), ("project", "distinct")])
+        .sort_by("group")
+    )
+    monthly_core["Lead"] = lead_agg["Lead_first"].to_numpy()
+    # only the final sort + join of each group's distinct names runs in Python
+    project_names = project_cats.to_numpy(dtype=object)
+    monthly_core["Project name"] = [
+        ", ".join(sorted(project_names[codes]))
+        for codes in lead_agg["project_distinct"].to_pylist()
+    ]
+
+    # ==== 8b) Calculate Project Count per Month per QAI_ID ====
+    project_count = pd.DataFrame(
+        {"Project Count": lead_agg["project_count_distinct"].to_numpy()}, index=group_index
+    )
+
+    # ==== 9–13) Contributions and Attendance Merge ====
+    lead_contrib = pd.DataFrame({"Lead_Contribution": group_sums[:, -1]}, index=group_index)
+    month_total = (
+        lead_contrib.groupby(level="Month", sort=False, observed=True)["Lead_Contribution"]
+        .transform("sum")
+    )
+    lead_contrib["Contribution_%"] = (
+        (lead_contrib["Lead_Contribution"] / month_total) * 100
+    ).round(2).fillna(0)
+
+    # Contribution_% -> rating 1..5 (>=5 → 2, >=11 → 3, >=16 → 4, >=20 → 5)
+    contribution_bins = np.array([5, 11, 16, 20])
+    lead_contrib["Contribution_Rating"] = np.searchsorted(
+        contribution_bins, lead_contrib["Contribution_%"].to_numpy(), side="right"
+    ) + 1
+
+    attendance_agg = (
+        attendance_df.groupby(["Month", "QAI_ID"], sort=False, observed=True)
+        .agg({
+            "Score": "mean",
+            "Training and assessment performance": "mean"
+        })
+        .rename(columns={
+            "Score": "Attendance",
+            "Training and assessment performance": "Training and assessment performance"
+        })
+    )
+
+    # All aggregates are indexed by (Month, QAI_ID). lead_contrib and project_count share
+    # monthly_core's group_index; attendance is joined on its own so keys that exist only
+    # in Attendance can't add NaN rows to the concat (which would upcast Project Count)
+    merged = (
+        monthly_core.join([lead_contrib, project_count], how="left", sort=False)
+        .join(attendance_agg, how="left", sort=False)
+        .reset_index()
+    )
+
+    for c in ["Contribution_%", "Contribution_Rating", "Attendance", "Training and assessment performance"]:
+        if c not in merged.columns:
+            merged[c] = 0
+        merged[c] = to_num(merged[c]).fillna(0)
+
+    # ==== 14) Weighted Scoring ====
+    score_cols = [
+        # (Score column, input column, weight)
+        ("Score_Quality",       "Quality Score (RCA)",                  0.20),
+        ("Score_Timeliness",    "Project Delivery Timeliness",          0.10),
+        ("Score_Documentation", "Documentation & Reporting",            0.10),
+        ("Score_Communication", "Communication Efficiency",             0.10),
+        ("Score_Discipline",    "Discipline & Punctuality",             0.075),
+        ("Score_Contribution",  "Contribution_Rating",                  0.15),
+        ("Score_Attendance",    "Attendance",                           0.075),
+        ("Score_Training",      "Training and assessment performance",  0.20),
+    ]
+    score_names = [name for name, _, _ in score_cols]
+    score_inputs = merged[[col for _, col, _ in score_cols]].to_numpy(dtype=np.float64)
+    score_weights = np.array([w for _, _, w in score_cols])
+
+    scores = score_inputs * score_weights
+    merged[score_names] = scores
+    # add the Score_* columns left to right (not a matmul) so .xx5 ties round as before
+    total = scores[:, 0].copy()
+    for col in scores.T[1:]:
+        total += col
+    merged["Final KPI Score"] = np.round(total, 2)
+
+    # ==== 15) Final Report (exact headers like original) ====
+    # column selection already returns a new frame, no extra .copy() needed
+    final_report = merged[[
+        "Month", "QAI_ID", "Lead", "Project name", "Project Count",
+        "Score_Quality", "Score_Timeliness", "Score_Documentation",
+        "Score_Communication", "Score_Discipline",
+        "Score_Contribution", "Score_Attendance", "Score_Training",
+        "Final KPI Score"
+    ]]
+
+    # rename "Project name" -> "Project Name" and map exact header labels
+    final_report.columns = [
+        "Month",
+        "QAI_ID",
+        "Lead",
+        "Project Name",
+        "Project Count",
+        "Quality Score (RCA) (Out of 1.00 | Weight: 20%)",
+        "Project Delivery Timeliness (Out of 0.50 | Weight: 10%)",
+        "Documentation & Reporting (Out of 0.50 | Weight: 10%)",
+        "Communication Efficiency (Out of 0.50 | Weight: 10%)",
+        "Discipline & Punctuality (Out of 0.375 | Weight: 7.5%)",
+        "Contribution Rating (Out of 0.75 | Weight: 15%)",
+        "Attendance (Out of 0.375 | Weight: 7.5%)",
+        "Training & Assessment Performance (Out of 1.00 | Weight: 20%)",
+        "Final KPI Score (Weighted Total Out of 5.00)"
+    ]
+
+    return monthly_core, lead_contrib, attendance_agg, project_count, merged, final_report
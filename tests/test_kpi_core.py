@@ -0,0 +1,155 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kpi_core import compute_kpi, values_to_df
+
+LEAD_HEADER = [
+    "Lead", "Month", "QAI_ID", "Project name", "Quality Score (RCA)",
+    "Project Delivery Timeliness", "Documentation & Reporting",
+    "Communication Efficiency", "Discipline & Punctuality",
+]
+
+
+def test_blank_sheet_rows_do_not_produce_report_rows():
+    # Sheets API returns blank rows as [] and trims trailing empty cells
+    lead_values = [
+        LEAD_HEADER,
+        ["L1", "Jan", "qai 1", "Alpha", "4", "3", "3", "4", "5"],
+        [],
+        ["", "", "", "", "", "", "", "", ""],
+        ["L2", "Jan", "qai 2", "Beta", "5", "4", "4", "4", "4"],
+    ]
+    attendance_values = [
+        ["ID", "Month", "Attendance Score", "Training and assessment performance"],
+        ["qai 1", "Jan", "5", "4"],
+        [],
+    ]
+    pdr_values = [
+        ["Project Batch", "SUM of Effective Work Hour", "PDR"],
+        ["Alpha", "1,176.60", "0.5"],
+        [],
+        ["Beta", "40", "0.5"],
+    ]
+
+    *_, final_report = compute_kpi(
+        values_to_df(lead_values), values_to_df(pdr_values), values_to_df(attendance_values)
+    )
+
+    assert final_report["QAI_ID"].tolist() == ["QAI_1", "QAI_2"]
+    assert final_report["Month"].tolist() == ["January", "January"]
+
+
+def test_blank_project_names_are_neither_listed_nor_counted():
+    lead_values = [
+        LEAD_HEADER,
+        ["L1", "Jan", "qai 1", "Alpha", "4", "3", "3", "4", "5"],
+        ["L1", "Jan", "qai 1", "", "4", "3", "3", "4", "5"],
+        ["L1", "Jan", "qai 1", "Beta", "4", "3", "3", "4", "5"],
+    ]
+    attendance_values = [
+        ["ID", "Month", "Attendance Score", "Training and assessment performance"],
+        ["qai 1", "Jan", "5", "4"],
+    ]
+    pdr_values = [
+        ["Project Batch", "SUM of Effective Work Hour", "PDR"],
+        ["Alpha", "10", "0.5"],
+    ]
+
+    *_, final_report = compute_kpi(
+        values_to_df(lead_values), values_to_df(pdr_values), values_to_df(attendance_values)
+    )
+
+    assert final_report["Project Name"].tolist() == ["Alpha, Beta"]
+    assert final_report["Project Count"].tolist() == [2]
+
+
+def test_compute_kpi_leaves_input_frames_unchanged():
+    lead_df = values_to_df([
+        LEAD_HEADER,
+        ["L1", "Jan", "qai 1", "Alpha", "4", "3", "3", "4", "5"],
+    ])
+    pdr_df = values_to_df([
+        ["Project Batch", "SUM of Effective Work Hour", "PDR"],
+        ["Alpha", "10", "0.5"],
+    ])
+    attendance_df = values_to_df([
+        ["ID", "Month", "Attendance Score", "Training and assessment performance"],
+        ["qai 1", "Jan", "5", "4"],
+    ])
+    before = [df.copy() for df in (lead_df, pdr_df, attendance_df)]
+
+    compute_kpi(lead_df, pdr_df, attendance_df)
+
+    for df, original in zip((lead_df, pdr_df, attendance_df), before):
+        assert df.equals(original)
+        assert (df.dtypes == original.dtypes).all()
+
+
+def test_final_score_rounds_ties_like_left_to_right_sum():
+    # inputs [2, 0, 3, 2, 3, rating 1, 0, 0] sum to exactly 1.275 left to right
+    # (no PDR hours -> Contribution_% 0 -> rating 1; no attendance -> 0)
+    lead_values = [
+        LEAD_HEADER,
+        ["L1", "Jan", "qai 1", "Alpha", "2", "0", "3", "2", "3"],
+    ]
+    attendance_values = [
+        ["ID", "Month", "Attendance Score", "Training and assessment performance"],
+    ]
+    pdr_values = [
+        ["Project Batch", "SUM of Effective Work Hour", "PDR"],
+    ]
+
+    *_, final_report = compute_kpi(
+        values_to_df(lead_values), values_to_df(pdr_values), values_to_df(attendance_values)
+    )
+
+    row = final_report.iloc[0]
+    assert row["Contribution Rating (Out of 0.75 | Weight: 15%)"] == 0.15
+    assert row["Final KPI Score (Weighted Total Out of 5.00)"] == 1.27
+
+
+def test_attendance_only_keys_keep_project_count_integer():
+    lead_values = [
+        LEAD_HEADER,
+        ["L1", "Jan", "qai 1", "Alpha", "4", "3", "3", "4", "5"],
+        ["L1", "Jan", "qai 1", "Beta", "4", "3", "3", "4", "5"],
+    ]
+    attendance_values = [
+        ["ID", "Month", "Attendance Score", "Training and assessment performance"],
+        ["qai 1", "Jan", "5", "4"],
+        ["qai 9", "Feb", "5", "4"],
+    ]
+    pdr_values = [
+        ["Project Batch", "SUM of Effective Work Hour", "PDR"],
+        ["Alpha", "10", "0.5"],
+    ]
+
+    *_, merged, final_report = compute_kpi(
+        values_to_df(lead_values), values_to_df(pdr_values), values_to_df(attendance_values)
+    )
+
+    assert merged["Project Count"].dtype == "int64"
+    assert final_report["Project Count"].dtype == "int64"
+    assert final_report["Project Count"].tolist() == [2]
+
+
+def test_no_project_names_and_empty_project_hours():
+    lead_values = [
+        LEAD_HEADER,
+        ["L1", "Jan", "qai 1"],  # trailing cells trimmed -> Project name missing
+    ]
+    attendance_values = [
+        ["ID", "Month", "Attendance Score", "Training and assessment performance"],
+    ]
+    pdr_values = [
+        ["Project Batch", "SUM of Effective Work Hour", "PDR"],
+    ]
+
+    *_, final_report = compute_kpi(
+        values_to_df(lead_values), values_to_df(pdr_values), values_to_df(attendance_values)
+    )
+
+    assert final_report["Project Name"].tolist() == [""]
+    assert final_report["Project Count"].tolist() == [0]